@@ -1,29 +1,50 @@
 
 
 import asyncio
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, field_validator
-from typing import Optional
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
 import logging
+import re
+import orjson
 
-from services.logic import PredictionService
+from services.logic import get_prediction_service
+from services.ml_model import SmartCityMLModel
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-prediction_service = PredictionService()
+prediction_service = get_prediction_service()
 
+# Serializes every model fit/save: start-up warm-up and /model/retrain
 _retrain_lock = asyncio.Lock()
 
 
+async def _warm_up():
+    # Startup training saves the same pickles and checksums as /model/retrain,
+    # so hold its lock; a retrain meanwhile gets 409 instead of a second fit
+    async with _retrain_lock:
+        await prediction_service.warm_up()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Load/train the ML models in the background; /predict uses the statistical
+    # path until they are ready
+    warmup_task = asyncio.create_task(_warm_up())
+    # Warm the forecast cache off the request path and refresh it before it expires
+    refresh_task = asyncio.create_task(prediction_service.forecast_service.refresh_periodically())
     yield
-    await prediction_service.forecast_service.close()
-    logger.info("Forecast HTTP client closed")
+    for task in (warmup_task, refresh_task):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await prediction_service.close()
+    logger.info("Forecast and Groq HTTP clients closed")
 
 
 
@@ -32,6 +53,7 @@ app = FastAPI(
     description="AI-powered predictions with real ML models for Almaty urban monitoring",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
@@ -49,13 +71,17 @@ app.add_middleware(
 )
 
 
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
 class PredictionRequest(BaseModel):
     date: Optional[str] = None
-    temperature: Optional[float] = None
+    # Range checks run inside pydantic-core instead of Python validators
+    temperature: Optional[float] = Field(default=None, ge=-60, le=60)
     query: Optional[str] = None
     language: Optional[str] = None
 
-    live_aqi: Optional[int] = None
+    live_aqi: Optional[int] = Field(default=None, ge=0, le=500)
     live_traffic: Optional[float] = None
     live_temp: Optional[float] = None
 
@@ -63,18 +89,10 @@ class PredictionRequest(BaseModel):
     @classmethod
     def validate_date_format(cls, v: Optional[str]) -> Optional[str]:
         if v is not None and v != '':
-            import re
-            if not re.match(r'^\d{4}-\d{2}-\d{2}$', v):
+            if not _DATE_RE.match(v):
                 raise ValueError('Date must be in YYYY-MM-DD format')
         return v if v else None
 
-    @field_validator('temperature')
-    @classmethod
-    def validate_temperature_range(cls, v: Optional[float]) -> Optional[float]:
-        if v is not None and (v < -60 or v > 60):
-            raise ValueError('Temperature must be between -60 and 60')
-        return v
-
     @field_validator('query')
     @classmethod
     def validate_query_length(cls, v: Optional[str]) -> Optional[str]:
@@ -89,13 +107,6 @@ class PredictionRequest(BaseModel):
             raise ValueError('Language must be one of: ru, en, kk')
         return v if v else None
 
-    @field_validator('live_aqi')
-    @classmethod
-    def validate_aqi_range(cls, v: Optional[int]) -> Optional[int]:
-        if v is not None and (v < 0 or v > 500):
-            raise ValueError('AQI must be between 0 and 500')
-        return v
-
 
 class PredictionResponse(BaseModel):
     prediction: str
@@ -106,6 +117,10 @@ class PredictionResponse(BaseModel):
     is_mock: bool
 
 
+class BatchPredictionRequest(BaseModel):
+    requests: List[PredictionRequest] = Field(..., min_length=1, max_length=20)
+
+
 @app.get("/health")
 async def health_check():
     ml_info = prediction_service.ml_model.get_info()
@@ -139,17 +154,57 @@ async def predict(request: PredictionRequest):
         )
         return result
     except Exception as e:
-        logger.error(f"Prediction error: {e}")
+        logger.error("Prediction error: %s", e)
+        raise HTTPException(status_code=500, detail="Internal prediction error")
+
+
+@app.post("/predict/batch", response_model=List[PredictionResponse])
+async def predict_batch(batch: BatchPredictionRequest):
+    try:
+        logger.info("Batch prediction request: %d items", len(batch.requests))
+        return await prediction_service.predict_batch([r.model_dump() for r in batch.requests])
+    except Exception as e:
+        logger.error("Batch prediction error: %s", e)
         raise HTTPException(status_code=500, detail="Internal prediction error")
 
 
+@app.post("/predict/stream")
+async def predict_stream(request: PredictionRequest):
+    """
+    Server-sent events: `token` events with LLM text, then one `result` event.
+    An `error` event before `result` means the tokens so far were an interrupted
+    LLM answer; the fallback text follows as a new `token` event.
+    """
+    events = prediction_service.predict_stream(
+        date=request.date,
+        temperature=request.temperature,
+        query=request.query,
+        language=request.language,
+        live_aqi=request.live_aqi,
+        live_traffic=request.live_traffic,
+        live_temp=request.live_temp,
+    )
+
+    async def sse():
+        try:
+            async for event, payload in events:
+                if event == "result":
+                    payload = PredictionResponse(**payload).model_dump()
+                yield b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+        except Exception as e:
+            logger.error("Prediction stream error: %s", e)
+            yield b'event: error\ndata: "Internal prediction error"\n\n'
+
+    return StreamingResponse(sse(), media_type="text/event-stream")
+
+
 @app.get("/stats")
 async def get_stats():
     try:
         stats = prediction_service.get_data_stats()
         return {"success": True, "data": stats}
     except Exception as e:
-        logger.error(f"Stats error: {e}")
+        logger.error("Stats error: %s", e)
         raise HTTPException(status_code=500, detail="Internal stats error")
 
 
@@ -163,7 +218,7 @@ async def get_analytics(request: PredictionRequest):
         )
         return {"success": True, "data": data}
     except Exception as e:
-        logger.error(f"Analytics error: {e}")
+        logger.error("Analytics error: %s", e)
         raise HTTPException(status_code=500, detail="Internal analytics error")
 
 
@@ -173,24 +228,29 @@ async def model_info():
         info = prediction_service.ml_model.get_info()
         return {"success": True, "data": info}
     except Exception as e:
-        logger.error(f"Model info error: {e}")
+        logger.error("Model info error: %s", e)
         raise HTTPException(status_code=500, detail="Internal error")
 
 
 @app.post("/model/retrain")
 async def retrain_model():
     if _retrain_lock.locked():
-        raise HTTPException(status_code=409, detail="Retraining already in progress")
+        raise HTTPException(status_code=409, detail="Model training already in progress")
     try:
         async with _retrain_lock:
             if prediction_service.df is None:
                 raise HTTPException(status_code=400, detail="No data available")
-            metrics = prediction_service.ml_model.train(prediction_service.df)
+            # Train a fresh model in a worker thread so /predict keeps serving
+            # the current one, then swap it in only if training succeeded
+            model = SmartCityMLModel()
+            metrics = await asyncio.to_thread(model.train, prediction_service.df)
+            if model.is_trained:
+                prediction_service.ml_model = model
             return {"success": True, "data": metrics}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Retrain error: {e}")
+        logger.error("Retrain error: %s", e)
         raise HTTPException(status_code=500, detail="Training failed")
 
 
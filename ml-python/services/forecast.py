@@ -3,9 +3,10 @@
 import asyncio
 import logging
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,32 @@ ALMATY_LON = 76.8897
 FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
 AQI_FORECAST_URL = "https://air-quality-api.open-meteo.com/v1/air-quality"
 
+WEATHER_CODE_TEXT = {
+    0: "clear sky",
+    1: "mainly clear",
+    2: "partly cloudy",
+    3: "overcast",
+    45: "fog",
+    48: "rime fog",
+    51: "light drizzle",
+    53: "drizzle",
+    55: "dense drizzle",
+    61: "rain",
+    63: "moderate rain",
+    65: "heavy rain",
+    71: "snow",
+    73: "moderate snow",
+    75: "heavy snow",
+    77: "snow grains",
+    80: "rain showers",
+    81: "heavy showers",
+    85: "snow showers",
+    86: "heavy snow showers",
+    95: "thunderstorm",
+    96: "thunderstorm with hail",
+    99: "severe thunderstorm with hail",
+}
+
 
 class ForecastService:
 
@@ -23,42 +50,50 @@ class ForecastService:
 
     def __init__(self):
         self._cache: Optional[Dict[str, Any]] = None
-        self._cache_time: float = 0
+        self._cache_deadline: float = 0.0
         self._client: Optional[httpx.AsyncClient] = None
         self._lock = asyncio.Lock()
+        self._prompt_cache: Dict[Tuple[float, Optional[str]], str] = {}
 
     async def _get_client(self) -> httpx.AsyncClient:
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=10.0)
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=10.0,
+                limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+            )
         return self._client
 
     async def close(self):
         if self._client is not None and not self._client.is_closed:
             await self._client.aclose()
 
-    async def get_forecast(self) -> Optional[Dict[str, Any]]:
-        if self._cache and (time.time() - self._cache_time) < self.CACHE_TTL:
+    async def get_forecast(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        if not force and self._cache and time.monotonic() < self._cache_deadline:
             return self._cache
 
         async with self._lock:
-            if self._cache and (time.time() - self._cache_time) < self.CACHE_TTL:
+            if not force and self._cache and time.monotonic() < self._cache_deadline:
                 return self._cache
 
-            try:
-                weather, aqi = await asyncio.gather(
-                    self._fetch_weather_forecast(),
-                    self._fetch_aqi_forecast(),
-                )
-            except Exception as exc:
-                logger.error("Forecast fetch error: %s", exc)
+            weather, aqi = await asyncio.gather(
+                self._fetch_weather_forecast(),
+                self._fetch_aqi_forecast(),
+                return_exceptions=True,
+            )
+            if isinstance(weather, BaseException):
+                logger.error("Forecast fetch error: %s", weather)
                 return self._cache
-
             if weather is None:
                 return self._cache
+            if isinstance(aqi, BaseException):
+                logger.error("AQI forecast fetch error: %s", aqi)
+                aqi = None
 
             result = self._merge_forecasts(weather, aqi)
             self._cache = result
-            self._cache_time = time.time()
+            self._cache_deadline = time.monotonic() + self.CACHE_TTL
+            self._prompt_cache.clear()
             logger.info(
                 "Fetched %s-day forecast: %s daily points",
                 self.FORECAST_DAYS,
@@ -66,6 +101,17 @@ class ForecastService:
             )
             return result
 
+    async def refresh_periodically(self):
+        """Keep the cache warm: fetch now, then refresh a minute before each expiry."""
+        while True:
+            try:
+                await self.get_forecast(force=True)
+            except Exception as exc:
+                logger.error("Forecast refresh error: %s", exc)
+            # On failure the deadline has passed, so this retries after a minute.
+            remaining = self._cache_deadline - time.monotonic()
+            await asyncio.sleep(max(60.0, remaining - 60.0))
+
     async def _fetch_weather_forecast(self) -> Optional[Dict[str, Any]]:
         """Fetch daily and hourly weather forecast from Open-Meteo."""
         try:
@@ -129,6 +175,55 @@ class ForecastService:
                 return values[index]
         return default
 
+    @staticmethod
+    def _series_list(series: Dict[str, Any], length: int, *keys: str) -> List[Any]:
+        """First non-empty series among keys, cut or padded with None to the given length."""
+        for key in keys:
+            values = series.get(key)
+            if values:
+                values = list(values[:length])
+                return values + [None] * (length - len(values))
+        return [None] * length
+
+    @staticmethod
+    def _hourly_day_index(times: List[str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Group hourly ISO timestamps once into (day index per hour, distinct days)."""
+        if not times:
+            return None
+        # Key on the local YYYY-MM-DD prefix rather than parsing: numpy rejects
+        # malformed entries and shifts offset-suffixed ones to UTC, while a bad
+        # timestamp here should only miss its day
+        days = np.asarray([t[:10] if isinstance(t, str) else "" for t in times])
+        unique_days, day_index = np.unique(days, return_inverse=True)
+        return day_index, unique_days
+
+    @staticmethod
+    def _daily_mean_max(
+        hour_day_index: Optional[Tuple[np.ndarray, np.ndarray]],
+        values: List[Optional[float]],
+    ) -> Dict[str, Tuple[float, float]]:
+        """Group hourly values by day in one pass, skipping nulls: {YYYY-MM-DD: (mean, max)}."""
+        if hour_day_index is None or not values:
+            return {}
+        day_index, unique_days = hour_day_index
+        n = min(len(day_index), len(values))
+        day_index = day_index[:n]
+        vals = np.asarray(values[:n], dtype=float)
+        valid = ~np.isnan(vals)
+        day_index, vals = day_index[valid], vals[valid]
+
+        n_days = len(unique_days)
+        counts = np.bincount(day_index, minlength=n_days)
+        sums = np.bincount(day_index, weights=vals, minlength=n_days)
+        maxima = np.full(n_days, -np.inf)
+        np.maximum.at(maxima, day_index, vals)
+
+        return {
+            str(day): (float(sums[i] / counts[i]), float(maxima[i]))
+            for i, day in enumerate(unique_days)
+            if counts[i]
+        }
+
     def _merge_forecasts(self, weather: Dict[str, Any], aqi: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """Merge weather and AQI responses into daily and hourly structures."""
         daily_data = weather.get("daily", {})
@@ -141,17 +236,13 @@ class ForecastService:
         aqi_values = aqi_hourly.get("us_aqi", [])
         pm25_values = aqi_hourly.get("pm2_5", [])
 
+        hour_day_index = self._hourly_day_index(aqi_times)
+        aqi_by_day = self._daily_mean_max(hour_day_index, aqi_values)
+        pm25_by_day = self._daily_mean_max(hour_day_index, pm25_values)
+
         for index, date in enumerate(dates):
-            day_aqi = [
-                value
-                for timestamp, value in zip(aqi_times, aqi_values)
-                if timestamp.startswith(date) and value is not None
-            ]
-            day_pm25 = [
-                value
-                for timestamp, value in zip(aqi_times, pm25_values)
-                if timestamp.startswith(date) and value is not None
-            ]
+            aqi_stats = aqi_by_day.get(date)
+            pm25_stats = pm25_by_day.get(date)
 
             daily.append(
                 {
@@ -200,44 +291,34 @@ class ForecastService:
                         None,
                         "relative_humidity_2m_mean",
                     ),
-                    "aqi_mean": round(sum(day_aqi) / len(day_aqi)) if day_aqi else None,
-                    "aqi_max": max(day_aqi) if day_aqi else None,
-                    "pm25_mean": round(sum(day_pm25) / len(day_pm25), 1) if day_pm25 else None,
+                    "aqi_mean": round(aqi_stats[0]) if aqi_stats else None,
+                    "aqi_max": int(aqi_stats[1]) if aqi_stats else None,
+                    "pm25_mean": round(pm25_stats[0], 1) if pm25_stats else None,
                 }
             )
 
-        hourly = []
         hourly_times = hourly_data.get("time", [])
-        for index in range(min(self.FORECAST_DAYS * 24, len(hourly_times))):
-            hourly.append(
-                {
-                    "time": hourly_times[index],
-                    "temp": self._series_value(hourly_data, index, None, "temperature_2m"),
-                    "humidity": self._series_value(
-                        hourly_data,
-                        index,
-                        None,
-                        "relative_humidity_2m",
-                        "relativehumidity_2m",
-                    ),
-                    "wind": self._series_value(
-                        hourly_data,
-                        index,
-                        None,
-                        "wind_speed_10m",
-                        "windspeed_10m",
-                    ),
-                    "precip": self._series_value(hourly_data, index, None, "precipitation"),
-                    "weather_code": self._series_value(
-                        hourly_data,
-                        index,
-                        None,
-                        "weather_code",
-                        "weathercode",
-                    ),
-                    "aqi": self._series_value(aqi_hourly, index, None, "us_aqi"),
-                }
+        n_hours = min(self.FORECAST_DAYS * 24, len(hourly_times))
+        hourly = [
+            {
+                "time": timestamp,
+                "temp": temp,
+                "humidity": humidity,
+                "wind": wind,
+                "precip": precip,
+                "weather_code": code,
+                "aqi": aqi_value,
+            }
+            for timestamp, temp, humidity, wind, precip, code, aqi_value in zip(
+                hourly_times[:n_hours],
+                self._series_list(hourly_data, n_hours, "temperature_2m"),
+                self._series_list(hourly_data, n_hours, "relative_humidity_2m", "relativehumidity_2m"),
+                self._series_list(hourly_data, n_hours, "wind_speed_10m", "windspeed_10m"),
+                self._series_list(hourly_data, n_hours, "precipitation"),
+                self._series_list(hourly_data, n_hours, "weather_code", "weathercode"),
+                self._series_list(aqi_hourly, n_hours, "us_aqi"),
             )
+        ]
 
         return {
             "daily": daily,
@@ -260,6 +341,14 @@ class ForecastService:
         if not forecast or not forecast.get("daily"):
             return "Forecast data unavailable."
 
+        # Dates outside the forecast window render identically, so they share one entry.
+        if self.find_day_forecast(forecast, target_date) is None:
+            target_date = None
+        key = (forecast.get("fetched_at", 0.0), target_date)
+        cached = self._prompt_cache.get(key)
+        if cached is not None:
+            return cached
+
         lines = ["Open-Meteo forecast:"]
         for day in forecast["daily"]:
             marker = " <- target date" if target_date and day.get("date") == target_date else ""
@@ -279,35 +368,12 @@ class ForecastService:
             if aqi_mean is not None:
                 parts.append(f"AQI ~{aqi_mean}")
             lines.append(", ".join(parts) + marker)
-        return "\n".join(lines)
+        text = "\n".join(lines)
+        self._prompt_cache[key] = text
+        return text
 
     @staticmethod
     def _weather_code_to_text(code: Optional[int]) -> str:
         if code is None:
             return "unknown conditions"
-        mapping = {
-            0: "clear sky",
-            1: "mainly clear",
-            2: "partly cloudy",
-            3: "overcast",
-            45: "fog",
-            48: "rime fog",
-            51: "light drizzle",
-            53: "drizzle",
-            55: "dense drizzle",
-            61: "rain",
-            63: "moderate rain",
-            65: "heavy rain",
-            71: "snow",
-            73: "moderate snow",
-            75: "heavy snow",
-            77: "snow grains",
-            80: "rain showers",
-            81: "heavy showers",
-            85: "snow showers",
-            86: "heavy snow showers",
-            95: "thunderstorm",
-            96: "thunderstorm with hail",
-            99: "severe thunderstorm with hail",
-        }
-        return mapping.get(code, f"weather code {code}")
+        return WEATHER_CODE_TEXT.get(code, f"weather code {code}")
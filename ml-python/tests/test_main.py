@@ -1,6 +1,8 @@
 """
 Tests for SmartCity ML Service.
-Covers: AQI conversion, /health endpoint, /predict validation.
+Covers: AQI conversion, /health endpoint, /predict validation and streaming, model_type naming,
+warm-up vs /model/retrain locking, lag-feature cache, forecast aggregation, LLM answer cache
+and stream fallback.
 """
 
 import math
@@ -75,6 +77,13 @@ class TestPm25ToAqi:
             aqi = self.pm25_to_aqi(pm25)
             assert 0 <= aqi <= 500, f"pm25_to_aqi({pm25}) = {aqi}"
 
+    def test_array_matches_scalar(self):
+        import numpy as np
+        from services.ml_model import pm25_to_aqi_array
+        values = np.concatenate([np.arange(-100, 6001) / 10.0, [9.05, 35.45, float('nan')]])
+        expected = [self.pm25_to_aqi(v) for v in values]
+        assert pm25_to_aqi_array(values).tolist() == expected
+
 
 # ---------------------------------------------------------------------------
 # /health endpoint
@@ -132,6 +141,8 @@ class TestPredictValidation:
     def test_temperature_out_of_range(self):
         resp = client.post("/predict", json={"temperature": 100.0})
         assert resp.status_code == 422
+        # Field(le=60) constraint: pydantic's own error type and message
+        assert resp.json()["detail"][0]["type"] == "less_than_equal"
 
     def test_query_too_long(self):
         resp = client.post("/predict", json={"query": "x" * 2001})
@@ -140,3 +151,347 @@ class TestPredictValidation:
     def test_aqi_out_of_range(self):
         resp = client.post("/predict", json={"live_aqi": 501})
         assert resp.status_code == 422
+        assert resp.json()["detail"][0]["loc"] == ["body", "live_aqi"]
+
+    def test_batch_matches_single_predictions(self):
+        bodies = [{"date": "2025-06-15", "language": "en"}, {"date": "2025-01-11", "temperature": -12.0}]
+        resp = client.post("/predict/batch", json={"requests": bodies})
+        assert resp.status_code == 200
+        batch = resp.json()
+        for body, item in zip(bodies, batch):
+            single = client.post("/predict", json=body).json()
+            assert item["aqi_prediction"] == single["aqi_prediction"]
+            assert item["traffic_index_prediction"] == single["traffic_index_prediction"]
+
+    def test_batch_size_limits(self):
+        assert client.post("/predict/batch", json={"requests": []}).status_code == 422
+        assert client.post("/predict/batch", json={"requests": [{}] * 21}).status_code == 422
+
+    def test_stream_ends_with_result_event(self):
+        resp = client.post("/predict/stream", json={"date": "2025-06-15", "language": "en"})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = [block for block in resp.text.split("\n\n") if block]
+        assert events[0].startswith("event: token")
+        assert events[-1].startswith("event: result")
+        assert '"aqi_prediction"' in events[-1]
+
+
+# ---------------------------------------------------------------------------
+# SmartCityMLModel
+# ---------------------------------------------------------------------------
+
+class TestModelType:
+    def test_named_after_loaded_estimators(self):
+        from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+        from services.ml_model import SmartCityMLModel
+
+        model = SmartCityMLModel()
+        assert model._model_type == "HistGradientBoosting(PM2.5)+EPA_formula(AQI)+RandomForest(Traffic)"
+
+        # e.g. pickles saved before the switch to HistGradientBoosting
+        model.pm25_model = GradientBoostingRegressor()
+        model.traffic_model = RandomForestRegressor()
+        assert model._describe_models() == "GradientBoosting(PM2.5)+EPA_formula(AQI)+RandomForest(Traffic)"
+
+
+# ---------------------------------------------------------------------------
+# Model warm-up vs /model/retrain
+# ---------------------------------------------------------------------------
+
+class TestRetrainLock:
+    def test_retrain_rejected_while_warm_up_runs(self, monkeypatch):
+        import asyncio
+        import main
+
+        statuses = []
+
+        async def fake_warm_up():
+            statuses.append(client.post("/model/retrain").status_code)
+
+        monkeypatch.setattr(main.prediction_service, "warm_up", fake_warm_up)
+        asyncio.run(main._warm_up())
+
+        assert statuses == [409]
+        assert not main._retrain_lock.locked()
+
+
+# ---------------------------------------------------------------------------
+# Lag-feature cache
+# ---------------------------------------------------------------------------
+
+class TestLagCache:
+    def test_concurrent_lookups_across_evictions(self, monkeypatch):
+        import sys
+        from concurrent.futures import ThreadPoolExecutor
+        from datetime import datetime, timedelta
+        from main import prediction_service
+
+        service = prediction_service
+        # A tiny cache so clear() runs constantly while other threads read
+        monkeypatch.setattr(type(service), "_LAG_CACHE_MAX", 3)
+        days = [datetime(2023, 1, 1) + timedelta(days=i) for i in range(12)]
+
+        monkeypatch.setattr(service, "_lag_cache", {})
+        expected = [service._recent_lags(d) for d in days]
+        monkeypatch.setattr(service, "_lag_cache", {})
+
+        def walk(offset):
+            # Mostly repeat lookups (cache hits), from a per-thread starting day
+            order = (days[offset:] + days[:offset]) * 40
+            return [service._recent_lags(d) for d in order][:len(days)]
+
+        # Switch threads as often as possible to land inside the check-then-read window
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(walk, range(8)))
+        finally:
+            sys.setswitchinterval(interval)
+
+        for offset, result in enumerate(results):
+            assert result == expected[offset:] + expected[:offset]
+
+
+    def test_eviction_between_check_and_read(self, monkeypatch):
+        from datetime import datetime
+        from main import prediction_service
+
+        day = datetime(2023, 1, 1)
+        expected = prediction_service._recent_lags(day)
+
+        class EvictedAfterCheck(dict):
+            """Another thread's clear() lands right after a membership test."""
+
+            def __contains__(self, key):
+                found = super().__contains__(key)
+                self.clear()
+                return found
+
+        monkeypatch.setattr(prediction_service, "_lag_cache", EvictedAfterCheck({day.date(): expected}))
+        assert prediction_service._recent_lags(day) == expected
+
+
+# ---------------------------------------------------------------------------
+# ForecastService daily aggregation
+# ---------------------------------------------------------------------------
+
+class TestForecastMerge:
+    def test_daily_aqi_aggregates_skip_nulls(self):
+        from services.forecast import ForecastService
+
+        weather = {"daily": {"time": ["2025-01-01", "2025-01-02", "2025-01-03"]}, "hourly": {}}
+        aqi = {
+            "hourly": {
+                "time": ["2025-01-01T00:00", "2025-01-01T01:00", "2025-01-02T00:00", "2025-01-02T01:00"],
+                "us_aqi": [100, 151, None, 80],
+                "pm2_5": [35.0, 40.25, 20.0, None],
+            }
+        }
+        daily = ForecastService()._merge_forecasts(weather, aqi)["daily"]
+
+        assert (daily[0]["aqi_mean"], daily[0]["aqi_max"], daily[0]["pm25_mean"]) == (126, 151, 37.6)
+        assert (daily[1]["aqi_mean"], daily[1]["aqi_max"], daily[1]["pm25_mean"]) == (80, 80, 20.0)
+        assert (daily[2]["aqi_mean"], daily[2]["aqi_max"], daily[2]["pm25_mean"]) == (None, None, None)
+
+    def test_bad_timestamp_does_not_break_merge(self):
+        from services.forecast import ForecastService
+
+        weather = {"daily": {"time": ["2025-01-01", "2025-01-02"]}, "hourly": {}}
+        aqi = {
+            "hourly": {
+                "time": ["2025-01-01T00:00", "2025-01-01T01:00+06:00", "not-a-time", "", "2025-01-02T00:00"],
+                "us_aqi": [100, 120, 500, 500, 80],
+                "pm2_5": [35.0, 40.0, 300.0, 300.0, 20.0],
+            }
+        }
+        daily = ForecastService()._merge_forecasts(weather, aqi)["daily"]
+
+        assert (daily[0]["aqi_mean"], daily[0]["aqi_max"], daily[0]["pm25_mean"]) == (110, 120, 37.5)
+        assert (daily[1]["aqi_mean"], daily[1]["aqi_max"], daily[1]["pm25_mean"]) == (80, 80, 20.0)
+
+    def test_missing_aqi_response(self):
+        from services.forecast import ForecastService
+
+        weather = {"daily": {"time": ["2025-01-01"]}, "hourly": {}}
+        daily = ForecastService()._merge_forecasts(weather, None)["daily"]
+        assert daily[0]["aqi_mean"] is None
+
+    def test_hourly_series_padded_to_time_axis(self):
+        from services.forecast import ForecastService
+
+        weather = {
+            "daily": {},
+            "hourly": {
+                "time": ["2025-01-01T00:00", "2025-01-01T01:00"],
+                "temperature_2m": [-5.0, -6.0],
+                "windspeed_10m": [3.0, 4.0],
+            },
+        }
+        aqi = {"hourly": {"us_aqi": [90]}}
+        hourly = ForecastService()._merge_forecasts(weather, aqi)["hourly"]
+
+        assert [h["temp"] for h in hourly] == [-5.0, -6.0]
+        assert [h["wind"] for h in hourly] == [3.0, 4.0]
+        assert [h["aqi"] for h in hourly] == [90, None]
+        assert hourly[0]["humidity"] is None
+
+
+# ---------------------------------------------------------------------------
+# LLM answer cache
+# ---------------------------------------------------------------------------
+
+class TestLlmCache:
+    def test_repeated_question_skips_groq(self, monkeypatch):
+        import asyncio
+        from datetime import datetime
+        from main import prediction_service
+
+        calls = []
+
+        async def fake_complete(system_prompt, user_prompt):
+            calls.append(user_prompt)
+            return "cached answer"
+
+        monkeypatch.setattr(prediction_service, "_groq_complete", fake_complete)
+        monkeypatch.setattr(prediction_service, "_llm_cache", type(prediction_service._llm_cache)())
+        args = dict(
+            target_date=datetime(2025, 1, 10), now=datetime(2025, 1, 9, 12, 0),
+            temperature=-5.2, aqi=140, traffic=61.3, stats={}, live_aqi=None,
+            live_traffic=None, forecast_text="", ml_method="ML", ml_result=None, language="en",
+        )
+
+        first = asyncio.run(prediction_service._get_groq_prediction_v2(query="Is it safe to run?", **args))
+        second = asyncio.run(prediction_service._get_groq_prediction_v2(query="  is it SAFE to run? ", **args))
+
+        assert first == second == "cached answer"
+        assert len(calls) == 1
+
+    def test_key_follows_values_quoted_in_prompt(self):
+        from datetime import datetime
+        from main import prediction_service
+
+        args = dict(
+            target_date=datetime(2025, 1, 10), now=datetime(2025, 1, 9, 12, 0),
+            temperature=-5.2, aqi=140, traffic=61.3, live_aqi=None, live_traffic=None,
+            forecast_text="", ml_method="ML", ml_result=None, language="en", query="Run?",
+        )
+        key = prediction_service._llm_cache_key
+
+        # Same whole degree and traffic percent, but the prompt shows different numbers
+        assert key(args) != key({**args, "temperature": -4.8})
+        assert key(args) != key({**args, "traffic": 60.9})
+        assert key(args) != key({**args, "ml_result": {"pm25_prediction": 55.0, "aqi_prediction": 140}})
+        # Renders identically as "61.3%"
+        assert key(args) == key({**args, "traffic": 61.32})
+
+
+# ---------------------------------------------------------------------------
+# LLM streaming
+# ---------------------------------------------------------------------------
+
+class _FakeGroqStream:
+    """Async iterator over (delta, finish_reason) chunks, optionally failing at the end."""
+
+    def __init__(self, chunks, fail=False):
+        self.chunks, self.fail, self.closed = list(chunks), fail, False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        from types import SimpleNamespace
+
+        if not self.chunks:
+            if self.fail:
+                raise RuntimeError("connection reset")
+            raise StopAsyncIteration
+        delta, finish_reason = self.chunks.pop(0)
+        choice = SimpleNamespace(delta=SimpleNamespace(content=delta), finish_reason=finish_reason)
+        return SimpleNamespace(choices=[choice])
+
+    async def close(self):
+        self.closed = True
+
+
+def _fake_groq_client(stream):
+    from types import SimpleNamespace
+
+    async def create(**kwargs):
+        return stream
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+class TestPredictStream:
+    @pytest.fixture
+    def service(self, monkeypatch):
+        from main import prediction_service
+
+        async def no_forecast(force=False):
+            return None
+
+        monkeypatch.setattr(prediction_service.forecast_service, "get_forecast", no_forecast)
+        monkeypatch.setattr(prediction_service, "_llm_cache", type(prediction_service._llm_cache)())
+        return prediction_service
+
+    @staticmethod
+    def _events(service):
+        import asyncio
+
+        async def collect():
+            return [e async for e in service.predict_stream(date="2025-06-15", query="Run today?", language="en")]
+
+        return asyncio.run(collect())
+
+    def test_mid_stream_failure_falls_back_to_insight(self, service, monkeypatch):
+        monkeypatch.setattr(service, "groq_client", _fake_groq_client(
+            _FakeGroqStream([("Air is ", None), ("clean and", None)], fail=True)))
+        events = self._events(service)
+
+        kinds = [kind for kind, _ in events]
+        assert kinds[:2] == ["token", "token"] and "error" in kinds and kinds[-1] == "result"
+        result = events[-1][1]
+        assert result["prediction"].startswith(events[-2][1])  # fallback token carries the insight
+        assert "clean and" not in result["prediction"]
+        assert not service._llm_cache
+
+    def test_length_cutoff_marked_like_predict(self, service, monkeypatch):
+        stream = _FakeGroqStream([("Air is ", None), ("clean and", "length")])
+        monkeypatch.setattr(service, "groq_client", _fake_groq_client(stream))
+        events = self._events(service)
+
+        assert [payload for kind, payload in events if kind == "token"] == ["Air is ", "clean and", "…"]
+        assert events[-1][1]["prediction"] == "Air is clean and…"
+        assert stream.closed
+
+    def test_slot_freed_before_slow_client_reads(self, service, monkeypatch):
+        import asyncio
+
+        monkeypatch.setattr(service, "groq_client", _fake_groq_client(
+            _FakeGroqStream([("Air ", None), ("is ", None), ("clean.", "stop")])))
+
+        async def run():
+            monkeypatch.setattr(service, "_groq_slots", asyncio.Semaphore(1))
+            tokens = service._groq_stream("system", "user")
+            first = await tokens.__anext__()
+            for _ in range(5):
+                await asyncio.sleep(0)
+            freed = not service._groq_slots.locked()
+            return freed, [first] + [t async for t in tokens]
+
+        freed, tokens = asyncio.run(run())
+        assert freed
+        assert tokens == ["Air ", "is ", "clean."]
+
+    def test_slot_wait_times_out_to_insight(self, service, monkeypatch):
+        import asyncio
+
+        monkeypatch.setattr(service, "groq_client", _fake_groq_client(_FakeGroqStream([("never", None)])))
+        monkeypatch.setattr(service, "_GROQ_SLOT_TIMEOUT", 0.01)
+        monkeypatch.setattr(service, "_groq_slots", asyncio.Semaphore(0))
+        events = self._events(service)
+
+        assert [kind for kind, _ in events] == ["token", "result"]
+        assert "never" not in events[-1][1]["prediction"]
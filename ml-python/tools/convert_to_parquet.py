@@ -0,0 +1,29 @@
+"""
+Convert almaty_history.csv to Parquet for faster service start-up.
+
+PredictionService prefers data/almaty_history.parquet when it is at least as
+new as the CSV, so the column types (datetime, bool, ints) come straight from
+the Parquet schema instead of being re-parsed from text on every start.
+
+Usage:
+    python tools/convert_to_parquet.py [path/to/almaty_history.csv]
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+CSV_PATH = Path(__file__).parent.parent / "data" / "almaty_history.csv"
+
+
+def convert(csv_path: Path = CSV_PATH) -> Path:
+    df = pd.read_csv(csv_path, parse_dates=["date"], date_format="%Y-%m-%d")
+    parquet_path = csv_path.with_suffix(".parquet")
+    df.to_parquet(parquet_path, engine="pyarrow", compression="zstd", index=False)
+    print(f"Wrote {len(df)} records to {parquet_path}")
+    return parquet_path
+
+
+if __name__ == "__main__":
+    convert(Path(sys.argv[1]) if len(sys.argv) > 1 else CSV_PATH)
@@ -10,20 +10,38 @@ Output: ml-python/data/almaty_history.csv (~2200 rows, one per day, 2020-2026)
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 import sys
-import time
 
 ALMATY_LAT = 43.2389
 ALMATY_LON = 76.8897
 
 OUTPUT_PATH = Path(__file__).parent.parent / "data" / "almaty_history.csv"
+# Concurrent archive requests (weather + air quality, one per year)
+FETCH_WORKERS = 4
+# Fixed seed so the synthetic traffic column is reproducible between runs
+rng = np.random.default_rng(42)
 
 
-def fetch_weather_archive(start: str, end: str) -> pd.DataFrame:
+def make_session() -> requests.Session:
+    """
+    Keep-alive session for the archive APIs: one connection per worker and
+    retries with backoff on rate limiting / transient server errors.
+    """
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=FETCH_WORKERS, max_retries=retry))
+    return session
+
+
+def fetch_weather_archive(start: str, end: str, session: Optional[requests.Session] = None) -> pd.DataFrame:
     """Fetch daily weather from Open-Meteo Archive API."""
     url = "https://archive-api.open-meteo.com/v1/archive"
     params = {
@@ -44,12 +62,12 @@ def fetch_weather_archive(start: str, end: str) -> pd.DataFrame:
     }
 
     print(f"  Fetching weather {start} → {end} ...")
-    resp = requests.get(url, params=params, timeout=30)
+    resp = (session or requests).get(url, params=params, timeout=30)
     resp.raise_for_status()
     data = resp.json()["daily"]
 
     df = pd.DataFrame({
-        "date": pd.to_datetime(data["time"]),
+        "date": pd.to_datetime(data["time"], format="%Y-%m-%d"),
         "temperature": data["temperature_2m_mean"],
         "temp_min": data["temperature_2m_min"],
         "temp_max": data["temperature_2m_max"],
@@ -61,7 +79,7 @@ def fetch_weather_archive(start: str, end: str) -> pd.DataFrame:
     return df
 
 
-def fetch_air_quality_archive(start: str, end: str) -> pd.DataFrame:
+def fetch_air_quality_archive(start: str, end: str, session: Optional[requests.Session] = None) -> pd.DataFrame:
     """Fetch daily air quality from Open-Meteo Air Quality Archive API."""
     url = "https://air-quality-api.open-meteo.com/v1/air-quality"
     params = {
@@ -74,12 +92,12 @@ def fetch_air_quality_archive(start: str, end: str) -> pd.DataFrame:
     }
 
     print(f"  Fetching air quality {start} → {end} ...")
-    resp = requests.get(url, params=params, timeout=30)
+    resp = (session or requests).get(url, params=params, timeout=30)
     resp.raise_for_status()
     data = resp.json()["hourly"]
 
     df = pd.DataFrame({
-        "datetime": pd.to_datetime(data["time"]),
+        "datetime": pd.to_datetime(data["time"], format="%Y-%m-%dT%H:%M"),
         "pm25": data["pm2_5"],
         "pm10": data["pm10"],
         "no2": data["nitrogen_dioxide"],
@@ -87,69 +105,67 @@ def fetch_air_quality_archive(start: str, end: str) -> pd.DataFrame:
         "ozone": data["ozone"],
     })
 
-    # Aggregate hourly → daily mean
-    df["date"] = df["datetime"].dt.date
-    daily = df.groupby("date").agg({
+    # Aggregate hourly → daily mean (datetime64 day keys, not Python date objects)
+    df["date"] = df["datetime"].dt.floor("D")
+    daily = df.groupby("date", sort=False).agg({
         "pm25": "mean",
         "pm10": "mean",
         "no2": "mean",
         "so2": "mean",
         "ozone": "mean",
     }).reset_index()
-    daily["date"] = pd.to_datetime(daily["date"])
     return daily
 
 
-def pm25_to_aqi(pm25: float) -> int:
-    """Convert PM2.5 (μg/m³) to US EPA AQI.
+# (c_low, c_high, i_low, i_high)
+PM25_BREAKPOINTS = np.array([
+    (0.0,   9.0,   0,  50),
+    (9.1,  35.4,  51, 100),
+    (35.5,  55.4, 101, 150),
+    (55.5, 125.4, 151, 200),
+    (125.5, 225.4, 201, 300),
+    (225.5, 325.4, 301, 400),
+    (325.5, 500.4, 401, 500),
+])
+
+
+def pm25_to_aqi_array(pm25) -> np.ndarray:
+    """Convert PM2.5 (μg/m³) to US EPA AQI, vectorized over an array of values.
 
     Uses the February 2024 revised breakpoints (88 FR 5558).
-    Key change: "Good" category lowered from 12.0 to 9.0 µg/m³,
-    "Very Unhealthy" ceiling lowered from 150.4 to 125.4 µg/m³.
+    Key change: "Good" category lowered from 12.0 to 9.0 μg/m³,
+    "Very Unhealthy" ceiling lowered from 150.4 to 125.4 μg/m³.
+    NaN and negative values map to 0, values above the scale to 500.
     """
-    if pd.isna(pm25) or pm25 < 0:
-        return 0
+    pm25 = np.asarray(pm25, dtype=float)
     # Truncate to 1 decimal place to avoid falling through the 9.0–9.1 gap
-    import math as _math
-    pm25 = _math.floor(pm25 * 10) / 10
-    breakpoints = [
-        (0.0,   9.0,   0,  50),
-        (9.1,  35.4,  51, 100),
-        (35.5,  55.4, 101, 150),
-        (55.5, 125.4, 151, 200),
-        (125.5, 225.4, 201, 300),
-        (225.5, 325.4, 301, 400),
-        (325.5, 500.4, 401, 500),
-    ]
-    for c_low, c_high, i_low, i_high in breakpoints:
-        if c_low <= pm25 <= c_high:
-            aqi = (i_high - i_low) / (c_high - c_low) * (pm25 - c_low) + i_low
-            return int(round(aqi))
-    return 500 if pm25 > 500.4 else 0
+    truncated = np.floor(pm25 * 10) / 10
+    c_low_all = PM25_BREAKPOINTS[:, 0]
+    idx = np.clip(np.searchsorted(c_low_all, truncated, side="right") - 1, 0, len(PM25_BREAKPOINTS) - 1)
+    c_low, c_high, i_low, i_high = PM25_BREAKPOINTS[idx].T
+    aqi = np.rint((i_high - i_low) / (c_high - c_low) * (truncated - c_low) + i_low)
+    aqi = np.where(truncated <= c_high, aqi, np.where(truncated > 500.4, 500, 0))
+    aqi = np.where(pm25 >= 0, aqi, 0)
+    return aqi.astype(np.int64)
+
+
+# WMO weather code -> human-readable condition; unlisted codes are "cloudy"
+WMO_CONDITIONS = {
+    0: "clear",
+    **dict.fromkeys([1, 2, 3], "partly_cloudy"),
+    **dict.fromkeys([45, 48], "fog"),
+    **dict.fromkeys([51, 53, 55, 56, 57], "drizzle"),
+    **dict.fromkeys([61, 63, 65, 66, 67], "rain"),
+    **dict.fromkeys([71, 73, 75, 77], "snow"),
+    **dict.fromkeys([80, 81, 82], "rain_showers"),
+    **dict.fromkeys([85, 86], "snow_showers"),
+    **dict.fromkeys([95, 96, 99], "thunderstorm"),
+}
 
 
 def wmo_to_condition(code: int) -> str:
     """Convert WMO weather code to human-readable condition."""
-    if code == 0:
-        return "clear"
-    elif code in [1, 2, 3]:
-        return "partly_cloudy"
-    elif code in [45, 48]:
-        return "fog"
-    elif code in [51, 53, 55, 56, 57]:
-        return "drizzle"
-    elif code in [61, 63, 65, 66, 67]:
-        return "rain"
-    elif code in [71, 73, 75, 77]:
-        return "snow"
-    elif code in [80, 81, 82]:
-        return "rain_showers"
-    elif code in [85, 86]:
-        return "snow_showers"
-    elif code in [95, 96, 99]:
-        return "thunderstorm"
-    else:
-        return "cloudy"
+    return WMO_CONDITIONS.get(code, "cloudy")
 
 
 def generate_traffic_from_patterns(df: pd.DataFrame) -> pd.Series:
@@ -163,37 +179,27 @@ def generate_traffic_from_patterns(df: pd.DataFrame) -> pd.Series:
     - Extreme cold/rain reduces traffic slightly
     - Summer = lower traffic (vacations)
     """
-    traffic = pd.Series(index=df.index, dtype=float)
-
-    for i, row in df.iterrows():
-        day_of_week = row["date"].weekday()
-        month = row["date"].month
-        is_weekend = day_of_week >= 5
-        temp = row["temperature"]
-
-        # Base: weekday vs weekend
-        if is_weekend:
-            base = 35.0
-        else:
-            base = 65.0
-
-        # Seasonal adjustment
-        if month in [6, 7, 8]:  # Summer vacation
-            base *= 0.8
-        elif month in [12, 1, 2]:  # Winter
-            if temp is not None and not pd.isna(temp) and temp < -15:
-                base *= 0.85  # Very cold → fewer drivers
-
-        # Weather adjustment
-        precip = row.get("precipitation", 0) or 0
-        if precip > 10:  # Heavy rain/snow → more congestion
-            base *= 1.15
-        elif precip > 2:
-            base *= 1.05
-
-        # Add realistic noise
-        noise = np.random.normal(0, 8)
-        traffic[i] = max(10, min(100, base + noise))
+    day_of_week = df["date"].dt.weekday.to_numpy()
+    month = df["date"].dt.month.to_numpy()
+    temp = df["temperature"].to_numpy(dtype=float)
+    if "precipitation" in df.columns:
+        precip = df["precipitation"].fillna(0).to_numpy(dtype=float)
+    else:
+        precip = np.zeros(len(df))
+
+    # Base: weekday vs weekend
+    base = np.where(day_of_week >= 5, 35.0, 65.0)
+
+    # Seasonal adjustment: summer vacation, very cold winter days -> fewer drivers
+    base *= np.where(np.isin(month, [6, 7, 8]), 0.8, 1.0)
+    base *= np.where(np.isin(month, [12, 1, 2]) & (temp < -15), 0.85, 1.0)
+
+    # Weather adjustment: heavy rain/snow -> more congestion
+    base *= np.where(precip > 10, 1.15, np.where(precip > 2, 1.05, 1.0))
+
+    # Add realistic noise
+    noise = rng.normal(0, 8, size=len(df))
+    traffic = pd.Series(np.clip(base + noise, 10, 100), index=df.index)
 
     return traffic.round(1)
 
@@ -210,20 +216,43 @@ def main():
 
     print(f"\nDate range: {start_date} → {end_date}")
 
-    # Fetch weather in yearly chunks (API limit)
-    weather_frames = []
-    years = range(2020, datetime.now().year + 1)
-    for year in years:
+    # The archives accept the whole range in one request; yearly chunks are only
+    # the fallback if that is rejected or times out. Both archives are fetched
+    # concurrently over one keep-alive session; the small pool keeps the load on
+    # the API polite
+    chunks = []
+    for year in range(2020, datetime.now().year + 1):
         y_start = f"{year}-01-01"
-        y_end = min(f"{year}-12-31", end_date)
         if y_start > end_date:
             break
+        chunks.append((year, y_start, min(f"{year}-12-31", end_date)))
+
+    def fetch(label, fetcher, span, span_start, span_end):
         try:
-            wf = fetch_weather_archive(y_start, y_end)
-            weather_frames.append(wf)
-            time.sleep(0.5)  # Be nice to API
+            return fetcher(span_start, span_end, session=session)
         except Exception as e:
-            print(f"  ⚠ Weather fetch failed for {year}: {e}")
+            print(f"  ⚠ {label} fetch failed for {span}: {e}")
+            return None
+
+    archives = {"Weather": fetch_weather_archive, "Air quality": fetch_air_quality_archive}
+    frames = {}
+    with make_session() as session, ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        full_jobs = {
+            label: pool.submit(fetch, label, fetcher, "full range", start_date, end_date)
+            for label, fetcher in archives.items()
+        }
+        yearly_jobs = {}
+        for label, job in full_jobs.items():
+            frame = job.result()
+            if frame is not None:
+                frames[label] = [frame]
+            else:
+                print(f"  Falling back to yearly {label.lower()} requests")
+                yearly_jobs[label] = [pool.submit(fetch, label, archives[label], *c) for c in chunks]
+        for label, jobs in yearly_jobs.items():
+            frames[label] = [f for f in (job.result() for job in jobs) if f is not None]
+    weather_frames = frames["Weather"]
+    aq_frames = frames["Air quality"]
 
     if not weather_frames:
         print("ERROR: No weather data fetched!")
@@ -232,20 +261,6 @@ def main():
     weather_df = pd.concat(weather_frames, ignore_index=True)
     print(f"\n✓ Weather: {len(weather_df)} days")
 
-    # Fetch air quality in yearly chunks
-    aq_frames = []
-    for year in years:
-        y_start = f"{year}-01-01"
-        y_end = min(f"{year}-12-31", end_date)
-        if y_start > end_date:
-            break
-        try:
-            af = fetch_air_quality_archive(y_start, y_end)
-            aq_frames.append(af)
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"  ⚠ Air quality fetch failed for {year}: {e}")
-
     if aq_frames:
         aq_df = pd.concat(aq_frames, ignore_index=True)
         print(f"✓ Air Quality: {len(aq_df)} days")
@@ -255,7 +270,7 @@ def main():
 
     # Merge weather + air quality
     if len(aq_df) > 0:
-        merged = weather_df.merge(aq_df, on="date", how="left")
+        merged = weather_df.merge(aq_df, on="date", how="left", validate="m:1")
     else:
         merged = weather_df.copy()
         merged["pm25"] = None
@@ -263,7 +278,7 @@ def main():
 
     # Calculate EPA AQI from PM2.5
     if "pm25" in merged.columns:
-        merged["aqi"] = merged["pm25"].apply(pm25_to_aqi)
+        merged["aqi"] = pm25_to_aqi_array(merged["pm25"].to_numpy(dtype=float))
     else:
         merged["aqi"] = 50  # fallback
 
@@ -271,9 +286,8 @@ def main():
     merged["day_of_week"] = merged["date"].dt.weekday
     merged["month"] = merged["date"].dt.month
     merged["is_weekend"] = merged["day_of_week"] >= 5
-    merged["condition"] = merged["weather_code"].apply(
-        lambda x: wmo_to_condition(int(x)) if pd.notna(x) else "cloudy"
-    )
+    # One hash lookup per row; missing and unknown codes fall back to "cloudy"
+    merged["condition"] = merged["weather_code"].map(WMO_CONDITIONS).fillna("cloudy")
 
     # Generate traffic estimation
     merged["traffic_index"] = generate_traffic_from_patterns(merged)
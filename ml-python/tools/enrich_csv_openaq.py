@@ -14,18 +14,105 @@ For diploma: "PM2.5 from OpenAQ (AirNow/US Embassy reference grade),
 other pollutants restored via seasonal interpolation from Open-Meteo data"
 """
 
+import asyncio
+import math
 import httpx
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime, timedelta
+from typing import Optional
 import time
+import shutil
 import sys
 
 OPENAQ_API_KEY = sys.argv[1] if len(sys.argv) > 1 else ""
 SENSOR_ID = 25903
 CSV_PATH = Path(__file__).parent.parent / "data" / "almaty_history.csv"
 BACKUP_PATH = Path(__file__).parent.parent / "data" / "almaty_history_backup.csv"
+# Fixed seed so the seasonal fill is reproducible between runs
+rng = np.random.default_rng(42)
+# Measurement pages requested in parallel (replaces a fixed sleep between pages)
+OPENAQ_CONCURRENCY = 4
+
+
+async def _fetch_openaq_pages(api_key: str, date_from: str, date_to: str, limit: int) -> list:
+    """
+    Page through the sensor's measurements. Once page 1 reports an exact
+    `meta.found`, all remaining pages are queued at once (a semaphore keeps
+    OPENAQ_CONCURRENCY in flight); otherwise pages are crawled
+    OPENAQ_CONCURRENCY at a time, stopping at the first short page.
+    Returns one [datetime, pm25] DataFrame per page.
+    """
+    base_url = f"https://api.openaq.org/v3/sensors/{SENSOR_ID}/measurements"
+    limits = httpx.Limits(max_connections=OPENAQ_CONCURRENCY)
+    # Queued pages wait here rather than in the connection pool, where a slow
+    # page would make the ones behind it fail with PoolTimeout
+    in_flight = asyncio.Semaphore(OPENAQ_CONCURRENCY)
+    frames = []
+    total = 0
+
+    async with httpx.AsyncClient(headers={"X-API-Key": api_key}, timeout=30, limits=limits) as client:
+        async def get_page(page: int) -> httpx.Response:
+            params = {
+                "date_from": date_from,
+                "date_to": date_to,
+                "limit": limit,
+                "page": page,
+            }
+            async with in_flight:
+                print(f"  Fetching page {page} ({date_from} → {date_to})...")
+                return await client.get(base_url, params=params)
+
+        def consume(resp: httpx.Response) -> Optional[dict]:
+            """Collect one page; returns its payload, or None once paging should stop."""
+            nonlocal total
+            if resp.status_code != 200:
+                print(f"  ERROR: Status {resp.status_code}: {resp.text[:200]}")
+                return None
+
+            payload = resp.json()
+            results = payload.get("results", [])
+            if not results:
+                return None
+
+            # Columns straight from the JSON; rows without a value or a
+            # timestamp are dropped once per page
+            page_df = pd.DataFrame({
+                "datetime": [r.get("period", {}).get("datetimeFrom", {}).get("local", "") for r in results],
+                "pm25": np.array([r.get("value") for r in results], dtype=float),
+            })
+            page_df = page_df[page_df["pm25"].notna() & (page_df["datetime"] != "")]
+            frames.append(page_df)
+            total += len(page_df)
+            print(f"    Got {len(results)} records (total so far: {total})")
+
+            # Check if there are more pages
+            return payload if len(results) == limit else None
+
+        first = consume(await get_page(1))
+        if first is None:
+            return frames
+
+        # Responses are walked in page order so records stay sorted and the
+        # stop conditions match a sequential crawl
+        found = first.get("meta", {}).get("found")
+        if isinstance(found, int):
+            responses = await asyncio.gather(*(get_page(p) for p in range(2, math.ceil(found / limit) + 1)))
+            for resp in responses:
+                if consume(resp) is None:
+                    break
+            return frames
+
+        # `found` is missing or only a lower bound (e.g. ">1000")
+        page = 2
+        while True:
+            window = range(page, page + OPENAQ_CONCURRENCY)
+            responses = await asyncio.gather(*(get_page(p) for p in window))
+            for resp in responses:
+                if consume(resp) is None:
+                    return frames
+            page += OPENAQ_CONCURRENCY
 
 
 def fetch_openaq_pm25(api_key: str, date_from: str, date_to: str) -> pd.DataFrame:
@@ -33,58 +120,13 @@ def fetch_openaq_pm25(api_key: str, date_from: str, date_to: str) -> pd.DataFram
     Download hourly PM2.5 from OpenAQ v3 API, paginating through all results.
     Returns DataFrame with columns: [datetime_utc, pm25].
     """
-    headers = {"X-API-Key": api_key}
-    base_url = f"https://api.openaq.org/v3/sensors/{SENSOR_ID}/measurements"
+    frames = asyncio.run(_fetch_openaq_pages(api_key, date_from, date_to, limit=1000))
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
-    all_records = []
-    page = 1
-    limit = 1000
-
-    while True:
-        params = {
-            "date_from": date_from,
-            "date_to": date_to,
-            "limit": limit,
-            "page": page,
-        }
-        print(f"  Fetching page {page} ({date_from} → {date_to})...")
-
-        resp = httpx.get(base_url, headers=headers, params=params, timeout=30)
-        if resp.status_code != 200:
-            print(f"  ERROR: Status {resp.status_code}: {resp.text[:200]}")
-            break
-
-        data = resp.json()
-        results = data.get("results", [])
-
-        if not results:
-            break
-
-        for r in results:
-            value = r.get("value")
-            period = r.get("period", {})
-            dt_from = period.get("datetimeFrom", {}).get("local", "")
-            if value is not None and dt_from:
-                all_records.append({
-                    "datetime": dt_from,
-                    "pm25": float(value),
-                })
-
-        found = data.get("meta", {}).get("found", 0)
-        print(f"    Got {len(results)} records (total so far: {len(all_records)})")
-
-        # Check if there are more pages
-        if len(results) < limit:
-            break
-
-        page += 1
-        time.sleep(0.3)  # Rate limiting
-
-    if not all_records:
+    if df.empty:
         return pd.DataFrame(columns=["datetime", "pm25"])
 
-    df = pd.DataFrame(all_records)
-    df["datetime"] = pd.to_datetime(df["datetime"], utc=False)
+    df["datetime"] = pd.to_datetime(df["datetime"], utc=False, format="ISO8601")
     return df
 
 
@@ -93,119 +135,126 @@ def aggregate_daily(hourly_df: pd.DataFrame) -> pd.DataFrame:
     if hourly_df.empty:
         return pd.DataFrame(columns=["date", "pm25_openaq"])
 
-    hourly_df["date"] = hourly_df["datetime"].dt.date
-    daily = hourly_df.groupby("date").agg(
+    # Group on datetime64 day keys, not Python date objects; OpenAQ local times
+    # carry a UTC offset, so drop it first to keep the local calendar day
+    local_time = hourly_df["datetime"]
+    if local_time.dt.tz is not None:
+        local_time = local_time.dt.tz_localize(None)
+    hourly_df["date"] = local_time.dt.floor("D")
+    daily = hourly_df.groupby("date", sort=False).agg(
         pm25_openaq=("pm25", "mean"),
         pm25_count=("pm25", "count"),
     ).reset_index()
-    daily["date"] = pd.to_datetime(daily["date"])
 
     # Only keep days with at least 6 hours of data (quality filter)
     daily = daily[daily["pm25_count"] >= 6].drop(columns=["pm25_count"])
     return daily
 
 
-def seasonal_fill(df: pd.DataFrame, col: str, source_mask: pd.Series, target_mask: pd.Series) -> pd.Series:
-    """
-    Fill missing values using seasonal patterns from existing data.
+# Weather bucket index per WMO code 0-99 (same thresholds as a <=3 / <=48 /
+# <=67 / <=77 chain); NaN and out-of-range codes fall into "other"
+WEATHER_BUCKETS = np.array(["clear", "cloudy", "fog", "rain", "snow", "other"])
+WEATHER_BUCKET_LUT = np.full(100, 5, dtype=np.int8)
+WEATHER_BUCKET_LUT[0] = 0
+WEATHER_BUCKET_LUT[1:4] = 1
+WEATHER_BUCKET_LUT[4:49] = 2
+WEATHER_BUCKET_LUT[49:68] = 3
+WEATHER_BUCKET_LUT[68:78] = 4
 
-    For each (month, weather_bucket), compute mean + std from source data,
-    then generate realistic values for target rows.
-    """
-    result = df[col].copy()
 
+def seasonal_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-row (month, weather_bucket) matching keys for seasonal_fill."""
     # Create weather buckets for better matching
-    def weather_bucket(code):
-        if pd.isna(code):
-            return "other"
-        code = int(code)
-        if code == 0:
-            return "clear"
-        elif code <= 3:
-            return "cloudy"
-        elif code <= 48:
-            return "fog"
-        elif code <= 67:
-            return "rain"
-        elif code <= 77:
-            return "snow"
-        else:
-            return "other"
+    code = df["weather_code"].to_numpy(dtype=float)
+    known = (code >= 0) & (code < 100)  # False for NaN
+    bucket = np.where(known, WEATHER_BUCKET_LUT[np.where(known, code, 0).astype(np.intp)], 5)
+    return pd.DataFrame({"month": df["date"].dt.month, "weather_bucket": WEATHER_BUCKETS[bucket]}, index=df.index)
+
 
-    df_temp = df.copy()
-    df_temp["weather_bucket"] = df_temp["weather_code"].apply(weather_bucket)
-    df_temp["month"] = df_temp["date"].dt.month
+def seasonal_fill(
+    df: pd.DataFrame, col: str, keys: pd.DataFrame, source_mask: pd.Series, target_mask: pd.Series,
+) -> pd.Series:
+    """
+    Fill missing values using seasonal patterns from existing data.
+
+    For each (month, weather_bucket) in `keys` (from seasonal_keys), compute
+    mean + std from source data, then generate realistic values for target rows.
+    """
+    month = keys["month"]
+    weather_bucket = keys["weather_bucket"]
 
     # Compute seasonal patterns from source data
-    source_data = df_temp[source_mask & df_temp[col].notna()]
-    patterns = source_data.groupby(["month", "weather_bucket"])[col].agg(["mean", "std"]).reset_index()
-    month_patterns = source_data.groupby("month")[col].agg(["mean", "std"]).reset_index()
-
-    filled_count = 0
-    for idx in df_temp[target_mask & df_temp[col].isna()].index:
-        month = df_temp.loc[idx, "month"]
-        wb = df_temp.loc[idx, "weather_bucket"]
-
-        # Try month + weather_bucket match first
-        match = patterns[(patterns["month"] == month) & (patterns["weather_bucket"] == wb)]
-        if len(match) > 0 and not pd.isna(match.iloc[0]["mean"]):
-            mean_val = match.iloc[0]["mean"]
-            std_val = match.iloc[0]["std"] if not pd.isna(match.iloc[0]["std"]) else mean_val * 0.2
-        else:
-            # Fallback to month-only
-            match = month_patterns[month_patterns["month"] == month]
-            if len(match) > 0:
-                mean_val = match.iloc[0]["mean"]
-                std_val = match.iloc[0]["std"] if not pd.isna(match.iloc[0]["std"]) else mean_val * 0.2
-            else:
-                continue
-
-        # Add temperature correlation: colder → higher PM2.5 (Almaty heating effect)
-        temp = df_temp.loc[idx, "temperature"]
-        if not pd.isna(temp) and month in [10, 11, 12, 1, 2, 3]:
-            # Below -10°C: increase PM by up to 30%
-            if temp < -10:
-                mean_val *= 1.0 + min(0.3, (-10 - temp) * 0.015)
-            # Below 0°C: slight increase
-            elif temp < 0:
-                mean_val *= 1.0 + (-temp) * 0.008
-
-        # Generate value with noise
-        value = np.random.normal(mean_val, std_val * 0.5)
-        value = max(1.0, value)  # PM values can't be negative
-        result[idx] = round(value, 1)
-        filled_count += 1
+    has_source = source_mask & df[col].notna()
+    source_data = pd.DataFrame({"month": month, "weather_bucket": weather_bucket, col: df[col]})[has_source]
+    patterns = source_data.groupby(["month", "weather_bucket"])[col].agg(["mean", "std"])
+    month_patterns = source_data.groupby("month")[col].agg(["mean", "std"])
+
+    # Target rows are addressed positionally through plain NumPy arrays
+    targets = (target_mask & df[col].isna()).to_numpy()
+    t_month = month.to_numpy()[targets]
+    target_keys = pd.MultiIndex.from_arrays([t_month, weather_bucket.to_numpy()[targets]])
+
+    # Try month + weather_bucket match first, fall back to month-only; a missing
+    # std becomes 20% of the mean it belongs to
+    mw_mean = patterns["mean"].reindex(target_keys).to_numpy()
+    mw_std = patterns["std"].reindex(target_keys).to_numpy()
+    m_mean = month_patterns["mean"].reindex(t_month).to_numpy()
+    m_std = month_patterns["std"].reindex(t_month).to_numpy()
+    use_mw = ~np.isnan(mw_mean)
+    mean_val = np.where(use_mw, mw_mean, m_mean)
+    std_val = np.where(use_mw, mw_std, m_std)
+    std_val = np.where(np.isnan(std_val), mean_val * 0.2, std_val)
+
+    # Add temperature correlation: colder → higher PM2.5 (Almaty heating effect)
+    temp = df["temperature"].to_numpy(dtype=float)[targets]
+    heating = np.isin(t_month, [10, 11, 12, 1, 2, 3])
+    # Below -10°C: increase PM by up to 30%; below 0°C: slight increase
+    mean_val = np.where(heating & (temp < -10), mean_val * (1.0 + np.minimum(0.3, (-10 - temp) * 0.015)), mean_val)
+    mean_val = np.where(heating & (temp >= -10) & (temp < 0), mean_val * (1.0 + (-temp) * 0.008), mean_val)
+
+    # Generate values with noise, in row order; rows without any monthly
+    # pattern stay missing
+    fillable = ~np.isnan(mean_val)
+    values = rng.normal(mean_val[fillable], std_val[fillable] * 0.5)
+    values = np.maximum(1.0, values)  # PM values can't be negative
+    out = df[col].to_numpy(dtype=float, copy=True)
+    out[np.flatnonzero(targets)[fillable]] = np.round(values, 1)
+    filled_count = int(fillable.sum())
 
     print(f"  Filled {filled_count} missing {col} values via seasonal interpolation")
-    return result
+    return pd.Series(out, index=df.index, name=col)
+
 
+# (c_low, c_high, i_low, i_high)
+PM25_BREAKPOINTS = np.array([
+    (0.0,   9.0,   0,  50),
+    (9.1,  35.4,  51, 100),
+    (35.5,  55.4, 101, 150),
+    (55.5, 125.4, 151, 200),
+    (125.5, 225.4, 201, 300),
+    (225.5, 325.4, 301, 400),
+    (325.5, 500.4, 401, 500),
+])
 
-def pm25_to_aqi(pm25: float) -> int:
-    """Convert PM2.5 (µg/m³) to US EPA AQI.
+
+def pm25_to_aqi_array(pm25) -> np.ndarray:
+    """Convert PM2.5 (µg/m³) to US EPA AQI, vectorized over an array of values.
 
     Uses the February 2024 revised breakpoints (88 FR 5558).
     Key change: "Good" category lowered from 12.0 to 9.0 µg/m³,
     "Very Unhealthy" ceiling lowered from 150.4 to 125.4 µg/m³.
+    NaN and negative values map to 0, values above the scale to 500.
     """
-    if pd.isna(pm25) or pm25 < 0:
-        return 0
+    pm25 = np.asarray(pm25, dtype=float)
     # Truncate to 1 decimal place to avoid falling through the 9.0–9.1 gap
-    import math as _math
-    pm25 = _math.floor(pm25 * 10) / 10
-    breakpoints = [
-        (0.0,   9.0,   0,  50),
-        (9.1,  35.4,  51, 100),
-        (35.5,  55.4, 101, 150),
-        (55.5, 125.4, 151, 200),
-        (125.5, 225.4, 201, 300),
-        (225.5, 325.4, 301, 400),
-        (325.5, 500.4, 401, 500),
-    ]
-    for c_low, c_high, i_low, i_high in breakpoints:
-        if c_low <= pm25 <= c_high:
-            aqi = (i_high - i_low) / (c_high - c_low) * (pm25 - c_low) + i_low
-            return int(round(aqi))
-    return 500 if pm25 > 500.4 else 0
+    truncated = np.floor(pm25 * 10) / 10
+    c_low_all = PM25_BREAKPOINTS[:, 0]
+    idx = np.clip(np.searchsorted(c_low_all, truncated, side="right") - 1, 0, len(PM25_BREAKPOINTS) - 1)
+    c_low, c_high, i_low, i_high = PM25_BREAKPOINTS[idx].T
+    aqi = np.rint((i_high - i_low) / (c_high - c_low) * (truncated - c_low) + i_low)
+    aqi = np.where(truncated <= c_high, aqi, np.where(truncated > 500.4, 500, 0))
+    aqi = np.where(pm25 >= 0, aqi, 0)
+    return aqi.astype(np.int64)
 
 
 def main():
@@ -218,13 +267,14 @@ def main():
     print("=" * 60)
 
     # Load current CSV
-    df = pd.read_csv(CSV_PATH, parse_dates=["date"])
+    df = pd.read_csv(CSV_PATH, parse_dates=["date"], date_format="%Y-%m-%d")
     print(f"\nLoaded {len(df)} records from {CSV_PATH}")
     print(f"Date range: {df.date.min().date()} → {df.date.max().date()}")
-    print(f"Missing PM2.5 before enrichment: {df.pm25.isna().sum()}")
+    pm25_missing = df["pm25"].isna()
+    print(f"Missing PM2.5 before enrichment: {pm25_missing.sum()}")
 
-    # Backup
-    df.to_csv(BACKUP_PATH, index=False)
+    # Backup: copy the file as-is rather than re-serializing the frame
+    shutil.copyfile(CSV_PATH, BACKUP_PATH)
     print(f"Backup saved to {BACKUP_PATH}")
 
     # Step 1: Download real PM2.5 from OpenAQ
@@ -260,20 +310,14 @@ def main():
         print(f"  Coverage: {openaq_pm25.date.min().date()} → {openaq_pm25.date.max().date()}")
         print(f"  PM2.5 range: {openaq_pm25.pm25_openaq.min():.1f} – {openaq_pm25.pm25_openaq.max():.1f} µg/m³")
 
-        # Merge into main DataFrame
-        df = df.merge(openaq_pm25[["date", "pm25_openaq"]], on="date", how="left")
+        # Look up each row's OpenAQ value by date (dates are unique after dedup)
+        pm25_openaq = df["date"].map(openaq_pm25.set_index("date")["pm25_openaq"])
 
         # Use OpenAQ PM2.5 where our CSV has NaN
-        mask_fill = df["pm25"].isna() & df["pm25_openaq"].notna()
+        mask_fill = df["pm25"].isna() & pm25_openaq.notna()
         filled_count = mask_fill.sum()
-        df.loc[mask_fill, "pm25"] = df.loc[mask_fill, "pm25_openaq"].round(1)
+        df.loc[mask_fill, "pm25"] = pm25_openaq[mask_fill].round(1)
         print(f"\n  Filled {filled_count} PM2.5 values from OpenAQ")
-
-        # Also recalculate AQI for those rows
-        df.loc[mask_fill, "aqi"] = df.loc[mask_fill, "pm25"].apply(pm25_to_aqi)
-        print(f"  Recalculated AQI for {filled_count} rows")
-
-        df = df.drop(columns=["pm25_openaq"])
     else:
         print("\n  WARNING: No OpenAQ data downloaded!")
 
@@ -290,27 +334,27 @@ def main():
     # Also use OpenAQ PM2.5 data as source if available
     pm25_source = df["pm25"].notna()
 
+    # Matching keys are shared by every filled column
+    keys = seasonal_keys(df)
+
     # Fill PM2.5 remaining gaps (2020-01-01 → 2020-04-08 where OpenAQ has no data)
     remaining_pm25_gaps = (target_mask & df["pm25"].isna()).sum()
     if remaining_pm25_gaps > 0:
         print(f"\n  PM2.5: {remaining_pm25_gaps} remaining gaps to fill")
-        df["pm25"] = seasonal_fill(df, "pm25", pm25_source, target_mask)
-        # Recalculate AQI for newly filled pm25
-        newly_filled = target_mask & df["aqi"].isna()
-        if newly_filled.any():
-            df.loc[target_mask, "aqi"] = df.loc[target_mask, "pm25"].apply(pm25_to_aqi)
+        df["pm25"] = seasonal_fill(df, "pm25", keys, pm25_source, target_mask)
 
     # Fill PM10, NO2, SO2, O3
     for col in ["pm10", "no2", "so2", "ozone"]:
         if col in df.columns:
             missing = (target_mask & df[col].isna()).sum()
             if missing > 0:
-                df[col] = seasonal_fill(df, col, source_mask, target_mask)
+                df[col] = seasonal_fill(df, col, keys, source_mask, target_mask)
 
-    # Final AQI recalculation for all rows that were missing
-    aqi_missing = df["aqi"] == 0
-    if aqi_missing.any():
-        df.loc[aqi_missing & df["pm25"].notna(), "aqi"] = df.loc[aqi_missing & df["pm25"].notna(), "pm25"].apply(pm25_to_aqi)
+    # Recalculate AQI once, for rows whose PM2.5 was filled above (OpenAQ or
+    # seasonal) and rows that still lack an AQI; valid AQI values are kept
+    needs_aqi = df["pm25"].notna() & (pm25_missing | df["aqi"].isna() | (df["aqi"] == 0))
+    df.loc[needs_aqi, "aqi"] = pm25_to_aqi_array(df.loc[needs_aqi, "pm25"].to_numpy(dtype=float))
+    print(f"\n  Recalculated AQI for {needs_aqi.sum()} rows")
 
     # Step 3: Save enriched CSV
     print("\n" + "=" * 60)
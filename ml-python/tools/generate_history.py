@@ -5,12 +5,21 @@ Creates realistic historical data for Almaty with seasonal patterns.
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 from pathlib import Path
-import random
 
 # Fixed seed for reproducible dataset generation
-random.seed(42)
+rng = np.random.default_rng(42)
+
+# WMO weather code per generated condition
+WEATHER_CODES = {
+    "clear": 0, "partly_cloudy": 2, "cloudy": 3,
+    "fog": 45, "rain": 61, "snow": 71, "hot": 0,
+}
+
+# Weather condition choices and weights: winter, summer, rest of the year
+WINTER_CONDITIONS = (["snow", "cloudy", "clear", "fog"], [0.4, 0.3, 0.2, 0.1])
+SUMMER_CONDITIONS = (["clear", "partly_cloudy", "hot", "rain"], [0.5, 0.3, 0.15, 0.05])
+OTHER_CONDITIONS = (["cloudy", "clear", "rain", "partly_cloudy"], [0.3, 0.3, 0.2, 0.2])
 
 
 def generate_almaty_history(
@@ -28,134 +37,76 @@ def generate_almaty_history(
     - Weekend vs weekday differences
     """
     
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    end = datetime.strptime(end_date, "%Y-%m-%d")
+    dates = pd.date_range(start_date, end_date, freq="D")
+    n = len(dates)
+    month = dates.month.to_numpy()
+    day_of_week = dates.weekday.to_numpy()
+    is_weekend = day_of_week >= 5
+    winter = np.isin(month, [12, 1, 2])
+    spring = np.isin(month, [3, 4, 5])
+    summer = np.isin(month, [6, 7, 8])
+    
+    # Temperature based on season (Almaty continental climate):
+    # winter, spring, summer, default = autumn
+    seasons = [winter, spring, summer]
+    temp = rng.normal(np.select(seasons, [-8, 12, 26], 8), np.select(seasons, [8, 8, 5], 8))
+    temp = np.clip(temp, np.select(seasons, [-30, -5, 15], -10), np.select(seasons, [5, 25, 40], 20))
+    
+    # AQI based on temperature and season (Almaty correlation): winter smog is
+    # very unhealthy below -15°C, unhealthy below -5°C, else USG; clean summer air
+    aqi_cases = [winter & (temp < -15), winter & (temp < -5), winter, summer]
+    aqi = np.trunc(rng.normal(np.select(aqi_cases, [200, 160, 120, 40], 80),
+                              np.select(aqi_cases, [40, 30, 25, 15], 25))).astype(int)
+    aqi = np.clip(aqi, np.select([winter, summer], [50, 10], 30), np.select([winter, summer], [300, 100], 150))
+    
+    # Traffic index (0-100): weekends, summer vacation and very cold weekdays
+    # (people stay home) are below the weekday norm
+    traffic_mean = np.select([is_weekend, summer, winter & (temp < -15)], [35, 50, 55], 70)
+    traffic = np.clip(rng.normal(traffic_mean, 15), 10, 100)
+    
+    # Humidity
+    humidity = rng.integers(np.select([winter, summer], [70, 30], 50), np.select([winter, summer], [90, 50], 70) + 1)
+    
+    # Wind speed (km/h)
+    wind = np.maximum(0, rng.normal(8, 5, n))
     
-    dates = []
-    current = start
-    while current <= end:
-        dates.append(current)
-        current += timedelta(days=1)
+    # PM2.5 estimated from AQI (inverse of EPA breakpoints, rough)
+    pm25 = np.select(
+        [aqi <= 50, aqi <= 100, aqi <= 150],
+        [aqi / 50 * 9.0, 9.1 + (aqi - 51) / 49 * (35.4 - 9.1), 35.5 + (aqi - 101) / 49 * (55.4 - 35.5)],
+        55.5 + (aqi - 151) / 49 * (125.4 - 55.5),
+    )
+    pm25 = np.maximum(0, np.round(pm25, 1))
     
-    records = []
+    # Precipitation (mm) – higher in spring/autumn, rare in winter
+    wet = np.isin(month, [4, 5, 10, 11])
+    precipitation = rng.normal(np.select([wet, summer], [3.0, 1.0], 0.5), np.select([wet, summer], [4.0, 2.5], 1.5))
+    precipitation = np.round(np.maximum(0, precipitation), 1)
     
-    for date in dates:
-        month = date.month
-        day_of_week = date.weekday()
-        is_weekend = day_of_week >= 5
-        
-        # Temperature based on month (Almaty continental climate)
-        if month in [12, 1, 2]:  # Winter
-            base_temp = random.gauss(-8, 8)
-            temp = max(-30, min(5, base_temp))
-        elif month in [3, 4, 5]:  # Spring
-            base_temp = random.gauss(12, 8)
-            temp = max(-5, min(25, base_temp))
-        elif month in [6, 7, 8]:  # Summer
-            base_temp = random.gauss(26, 5)
-            temp = max(15, min(40, base_temp))
-        else:  # Autumn
-            base_temp = random.gauss(8, 8)
-            temp = max(-10, min(20, base_temp))
-        
-        # AQI based on temperature and season (Almaty correlation)
-        if month in [12, 1, 2]:  # Winter - high smog
-            if temp < -15:
-                base_aqi = random.gauss(200, 40)  # Very unhealthy
-            elif temp < -5:
-                base_aqi = random.gauss(160, 30)  # Unhealthy
-            else:
-                base_aqi = random.gauss(120, 25)  # USG
-            aqi = max(50, min(300, int(base_aqi)))
-        elif month in [6, 7, 8]:  # Summer - clean air
-            base_aqi = random.gauss(40, 15)
-            aqi = max(10, min(100, int(base_aqi)))
-        else:
-            base_aqi = random.gauss(80, 25)
-            aqi = max(30, min(150, int(base_aqi)))
-        
-        # Traffic index (0-100)
-        if is_weekend:
-            base_traffic = random.gauss(35, 15)
-        else:
-            # Weekday - higher traffic
-            if month in [6, 7, 8]:  # Summer vacation
-                base_traffic = random.gauss(50, 15)
-            elif month in [12, 1, 2] and temp < -15:
-                # Very cold - people stay home
-                base_traffic = random.gauss(55, 15)
-            else:
-                base_traffic = random.gauss(70, 15)
-        
-        traffic = max(10, min(100, base_traffic))
-        
-        # Humidity
-        if month in [12, 1, 2]:
-            humidity = random.randint(70, 90)
-        elif month in [6, 7, 8]:
-            humidity = random.randint(30, 50)
-        else:
-            humidity = random.randint(50, 70)
-        
-        # Wind speed (km/h)
-        wind = max(0, random.gauss(8, 5))
-        
-        # PM2.5 estimated from AQI (inverse of EPA breakpoints, rough)
-        if aqi <= 50:
-            pm25 = round(aqi / 50 * 9.0, 1)
-        elif aqi <= 100:
-            pm25 = round(9.1 + (aqi - 51) / 49 * (35.4 - 9.1), 1)
-        elif aqi <= 150:
-            pm25 = round(35.5 + (aqi - 101) / 49 * (55.4 - 35.5), 1)
-        else:
-            pm25 = round(55.5 + (aqi - 151) / 49 * (125.4 - 55.5), 1)
-        pm25 = max(0, pm25)
-        
-        # Precipitation (mm) – higher in spring/autumn, rare in winter
-        if month in [4, 5, 10, 11]:
-            precipitation = round(max(0, random.gauss(3.0, 4.0)), 1)
-        elif month in [6, 7, 8]:
-            precipitation = round(max(0, random.gauss(1.0, 2.5)), 1)
-        else:
-            precipitation = round(max(0, random.gauss(0.5, 1.5)), 1)
-        
-        # WMO weather code
-        weather_code_map = {
-            "clear": 0, "partly_cloudy": 2, "cloudy": 3,
-            "fog": 45, "rain": 61, "snow": 71, "hot": 0,
-        }
-        
-        # Weather condition
-        if month in [12, 1, 2]:
-            conditions = ["snow", "cloudy", "clear", "fog"]
-            weights = [0.4, 0.3, 0.2, 0.1]
-        elif month in [6, 7, 8]:
-            conditions = ["clear", "partly_cloudy", "hot", "rain"]
-            weights = [0.5, 0.3, 0.15, 0.05]
-        else:
-            conditions = ["cloudy", "clear", "rain", "partly_cloudy"]
-            weights = [0.3, 0.3, 0.2, 0.2]
-        
-        condition = random.choices(conditions, weights=weights)[0]
-        weather_code = weather_code_map.get(condition, 0)
-        
-        records.append({
-            "date": date,
-            "temperature": round(temp, 1),
-            "humidity": humidity,
-            "wind_speed": round(wind, 1),
-            "aqi": aqi,
-            "pm25": pm25,
-            "precipitation": precipitation,
-            "weather_code": weather_code,
-            "traffic_index": round(traffic, 1),
-            "condition": condition,
-            "is_weekend": int(is_weekend),
-            "month": month,
-            "day_of_week": day_of_week
-        })
+    # Weather condition
+    condition = np.empty(n, dtype=object)
+    for mask, (choices, weights) in (
+        (winter, WINTER_CONDITIONS),
+        (summer, SUMMER_CONDITIONS),
+        (~(winter | summer), OTHER_CONDITIONS),
+    ):
+        condition[mask] = rng.choice(choices, size=int(mask.sum()), p=weights)
     
-    df = pd.DataFrame(records)
+    df = pd.DataFrame({
+        "date": dates,
+        "temperature": np.round(temp, 1),
+        "humidity": humidity,
+        "wind_speed": np.round(wind, 1),
+        "aqi": aqi,
+        "pm25": pm25,
+        "precipitation": precipitation,
+        "weather_code": [WEATHER_CODES[c] for c in condition],
+        "traffic_index": np.round(traffic, 1),
+        "condition": condition,
+        "is_weekend": is_weekend.astype(int),
+        "month": month,
+        "day_of_week": day_of_week,
+    })
     
     # Save to file
     if output_path:
@@ -177,8 +128,8 @@ def generate_almaty_history(
     print(f"  Winter avg: {df[df['month'].isin([12,1,2])]['aqi'].mean():.0f}")
     print(f"  Summer avg: {df[df['month'].isin([6,7,8])]['aqi'].mean():.0f}")
     print(f"\nTraffic Index:")
-    print(f"  Weekday avg: {df[~df['is_weekend']]['traffic_index'].mean():.1f}")
-    print(f"  Weekend avg: {df[df['is_weekend']]['traffic_index'].mean():.1f}")
+    print(f"  Weekday avg: {df[df['is_weekend'] == 0]['traffic_index'].mean():.1f}")
+    print(f"  Weekend avg: {df[df['is_weekend'] == 1]['traffic_index'].mean():.1f}")
     
     return df
 